@@ -12,12 +12,31 @@ class Settings:
     # Google API設定
     GOOGLE_API_KEY: str = os.getenv("GOOGLE_API_KEY", "")
     GCP_PROJECT_ID: str = os.getenv("GCP_PROJECT_ID", "")
+    GEMINI_MAX_CONCURRENCY: int = int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))
+    # 1分あたりのGemini呼び出し上限（0で無効。429を未然に防ぐクライアント側制限）
+    GEMINI_RPM_LIMIT: int = int(os.getenv("GEMINI_RPM_LIMIT", "0"))
+    ENABLE_GEMINI_CACHE: bool = os.getenv("ENABLE_GEMINI_CACHE", "true").lower() == "true"
+    GEMINI_CACHE_TTL: int = int(os.getenv("GEMINI_CACHE_TTL", "3600"))
+    # セマンティックキャッシュ（埋め込みAPI呼び出しが発生するためデフォルト無効）
+    ENABLE_GEMINI_SEMANTIC_CACHE: bool = os.getenv("ENABLE_GEMINI_SEMANTIC_CACHE", "false").lower() == "true"
+    GEMINI_SEMANTIC_CACHE_THRESHOLD: float = float(os.getenv("GEMINI_SEMANTIC_CACHE_THRESHOLD", "0.92"))
+    GEMINI_EMBEDDING_MODEL: str = os.getenv("GEMINI_EMBEDDING_MODEL", "models/text-embedding-004")
+    # Geminiに送る入力テキストの上限文字数（プレフィル時間とコストを抑制）
+    GEMINI_MAX_INPUT_CHARS: int = int(os.getenv("GEMINI_MAX_INPUT_CHARS", "30000"))
+    # バックグラウンド処理（財務分析など）を安価なモデルに振り分ける場合に指定
+    GEMINI_BACKGROUND_MODEL: str = os.getenv("GEMINI_BACKGROUND_MODEL", "")
+    # コンテキストキャッシュ（最小トークン数制限があるためデフォルト無効）
+    ENABLE_GEMINI_CONTEXT_CACHE: bool = os.getenv("ENABLE_GEMINI_CONTEXT_CACHE", "false").lower() == "true"
+    GEMINI_CONTEXT_CACHE_TTL: int = int(os.getenv("GEMINI_CONTEXT_CACHE_TTL", "3600"))
     
     # Vertex AI Search設定
     VERTEX_AI_SEARCH_DATA_STORE_ID: str = os.getenv("VERTEX_AI_SEARCH_DATA_STORE_ID", "minatoku_1750066687052")
     GCP_LOCATION: str = os.getenv("GCP_LOCATION", "global")
     VERTEX_AI_SEARCH_SERVING_CONFIG_ID: str = os.getenv("VERTEX_AI_SEARCH_SERVING_CONFIG_ID", "default_serving_config")
     ENABLE_VERTEX_AI_SEARCH: bool = os.getenv("ENABLE_VERTEX_AI_SEARCH", "true").lower() == "true"
+    VERTEX_MAX_CONCURRENCY: int = int(os.getenv("VERTEX_MAX_CONCURRENCY", "8"))
+    # 1分あたりのVertex AI Search呼び出し上限（0で無効。429を未然に防ぐクライアント側制限）
+    VERTEX_RPM_LIMIT: int = int(os.getenv("VERTEX_RPM_LIMIT", "0"))
     
     # GCS設定
     GCS_BUCKET_NAME: str = os.getenv("GCS_BUCKET_NAME", "")
@@ -33,6 +52,9 @@ class Settings:
     REQUEST_TIMEOUT: int = int(os.getenv("REQUEST_TIMEOUT", "30"))
     USER_AGENT: str = os.getenv("USER_AGENT", "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36")
     MAX_RETRIES: int = int(os.getenv("MAX_RETRIES", "3"))
+    # スクレイピング結果のキャッシュ（同一URLの再取得・再圧縮を回避）
+    ENABLE_SCRAPE_CACHE: bool = os.getenv("ENABLE_SCRAPE_CACHE", "true").lower() == "true"
+    SCRAPE_CACHE_TTL: int = int(os.getenv("SCRAPE_CACHE_TTL", "600"))
     
     # CORS設定
     CORS_ORIGINS: List[str] = ["*"]
@@ -1,10 +1,11 @@
 # main.py（完全版）
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
 from models.schemas import QueryRequest, AnalysisResponse, HealthResponse
 from services.scraping_service import ScrapingService
-from services.gemini_service import GeminiService
+from services.gemini_service import get_gemini_service
 from services.gcs_service import GCSService
 from services.vertex_ai_search_service import VertexAISearchService
 from config.settings import settings
@@ -48,7 +49,7 @@ async def lifespan(app: FastAPI):
         scraping_service = ScrapingService()
         logger.info("スクレイピングサービス初期化完了")
         
-        gemini_service = GeminiService()
+        gemini_service = get_gemini_service()
         logger.info("Geminiサービス初期化完了")
         
         # GCS サービスの初期化（オプション、エラーでも続行）
@@ -95,7 +96,9 @@ async def lifespan(app: FastAPI):
 app = FastAPI(
     title=settings.APP_NAME,
     version=settings.APP_VERSION,
-    lifespan=lifespan
+    lifespan=lifespan,
+    # レスポンスのJSONシリアライズをorjsonに委譲（stdlib jsonの2〜5倍高速）
+    default_response_class=ORJSONResponse
 )
 
 # CORS設定
@@ -193,11 +196,11 @@ async def analyze_property(request: QueryRequest):
                 except Exception as e:
                     logger.warning(f"抽出テキストのGCS保存に失敗: {e}")
             
-            analysis = gemini_service.analyze_property_from_url(extracted_text, request.response_format)
+            analysis = await gemini_service.analyze_property_from_url(extracted_text, request.response_format)
         else:
             logger.info(f"物件名分析開始: {query}")
             # 物件名の場合：直接Gemini分析
-            analysis = gemini_service.analyze_property_by_name(query, request.response_format)
+            analysis = await gemini_service.analyze_property_by_name(query, request.response_format)
         
         # 住所を抽出してVertex AI Searchで財務分析を実行
         financial_analysis = None
@@ -220,10 +223,10 @@ async def analyze_property(request: QueryRequest):
                     logger.info(f"住所を検出、財務分析開始: {address}")
                     
                     # Vertex AI Searchで財務情報を検索
-                    vertex_search_results = vertex_ai_search_service.search_financial_info(address)
+                    vertex_search_results = await vertex_ai_search_service.search_financial_info(address)
                     
                     # Geminiで財務分析を実行
-                    financial_analysis = gemini_service.analyze_financial_status(address, vertex_search_results)
+                    financial_analysis = await gemini_service.analyze_financial_status(address, vertex_search_results)
                     
                     # vertex_search_resultsからstructured_dataを取得
                     vertex_summary = vertex_search_results.get("summary", "") or vertex_search_results.get("answer_text", "")
@@ -333,9 +336,13 @@ async def analyze_property(request: QueryRequest):
             }
         
         # レスポンス形式に応じた処理
+        # raw_responseはraw_analysisとして返すので、analysis側からは取り除き
+        # 同じ数KBのテキストを二重にシリアライズ・転送しないようにする。
+        # popはキャッシュ由来のdictに波及しないよう浅いコピーに対して行う
         raw_analysis = None
         if request.response_format == "text" and "raw_response" in analysis:
-            raw_analysis = analysis.get("raw_response")
+            analysis = dict(analysis)
+            raw_analysis = analysis.pop("raw_response")
         
         # レスポンスオブジェクトを作成
         response_data = AnalysisResponse(
@@ -374,6 +381,40 @@ async def analyze_property(request: QueryRequest):
         logger.error(f"分析エラー: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post(f"{settings.API_PREFIX}/analyze-stream")
+async def analyze_property_stream(request: QueryRequest):
+    """物件分析をストリーミングで返すエンドポイント（テキスト形式）
+
+    生成済みテキストを逐次返すため、全文生成を待つ/analyzeより
+    最初の表示までの時間が大幅に短い。
+    """
+    try:
+        if not gemini_service:
+            raise HTTPException(status_code=503, detail="Gemini サービスが利用できません")
+
+        query = request.query.strip()
+
+        if not query:
+            raise HTTPException(status_code=400, detail="クエリが空です")
+
+        if scraping_service.is_url(query):
+            content = scraping_service.scrape_website(query, enable_compression=request.enable_compression)
+            is_url_analysis = True
+        else:
+            content = f"物件名: {query}"
+            is_url_analysis = False
+
+        return StreamingResponse(
+            gemini_service.stream_property_analysis(content, is_url_analysis=is_url_analysis),
+            media_type="text/plain; charset=utf-8"
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"ストリーミング分析エラー: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.post(f"{settings.API_PREFIX}/vertex-search")
 async def vertex_ai_search(query: str, page_size: int = 5):
     """Vertex AI Search を直接実行するエンドポイント"""
@@ -381,7 +422,7 @@ async def vertex_ai_search(query: str, page_size: int = 5):
         if not vertex_ai_search_service:
             raise HTTPException(status_code=503, detail="Vertex AI Search サービスが利用できません")
         
-        results = vertex_ai_search_service.search_general(query, page_size)
+        results = await vertex_ai_search_service.search_general(query, page_size)
         return results
         
     except HTTPException:
@@ -390,6 +431,18 @@ async def vertex_ai_search(query: str, page_size: int = 5):
         logger.error(f"Vertex AI Search エラー: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post(f"{settings.API_PREFIX}/vertex-search-stream")
+async def vertex_ai_search_stream(query: str, page_size: int = 5):
+    """Vertex AI Search の結果をNDJSONで逐次返すエンドポイント"""
+    if not vertex_ai_search_service:
+        raise HTTPException(status_code=503, detail="Vertex AI Search サービスが利用できません")
+
+    async def generate():
+        async for row in vertex_ai_search_service.stream_search_results(query, page_size):
+            yield json.dumps(row, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
 @app.post(f"{settings.API_PREFIX}/financial-analysis")
 async def analyze_financial_status_only(address: str):
     """住所の財務状況のみを分析するエンドポイント"""
@@ -401,10 +454,10 @@ async def analyze_financial_status_only(address: str):
             raise HTTPException(status_code=503, detail="Gemini サービスが利用できません")
         
         # Vertex AI Searchで財務情報を検索
-        search_results = vertex_ai_search_service.search_financial_info(address)
+        search_results = await vertex_ai_search_service.search_financial_info(address)
         
         # Geminiで財務分析を実行
-        financial_analysis = gemini_service.analyze_financial_status(address, search_results)
+        financial_analysis = await gemini_service.analyze_financial_status(address, search_results)
         
         return {
             "address": address,
@@ -829,14 +882,14 @@ async def test_json_parsing():
     """
     
     try:
-        from services.gemini_service import GeminiService
-        gemini_svc = GeminiService()
+        from services.gemini_service import get_gemini_service
+        gemini_svc = get_gemini_service()
         
         # JSON形式でテスト
-        json_result = gemini_svc.analyze_property_from_url(sample_text, "json")
-        
+        json_result = await gemini_svc.analyze_property_from_url(sample_text, "json")
+
         # TEXT形式でテスト
-        text_result = gemini_svc.analyze_property_from_url(sample_text, "text")
+        text_result = await gemini_svc.analyze_property_from_url(sample_text, "text")
         
         return {
             "json_analysis": json_result,
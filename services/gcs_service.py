@@ -1,15 +1,31 @@
 # services/gcs_service.py
+from google.api_core import retry
 from google.cloud import storage
+from google.cloud.exceptions import NotFound
 from google.oauth2 import service_account
+import gzip
 import json
 import logging
+import orjson
 import os
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, Optional, List
 from datetime import datetime, timezone
 from config.settings import settings
 
 logger = logging.getLogger(__name__)
 
+# gzip圧縮を適用する最小ペイロードサイズ（これ未満は圧縮オーバーヘッドの方が大きい）
+MIN_GZIP_SIZE = 1024
+
+# 一時的な503やコネクションリセットをローカルで高速リトライするための共通設定
+DEFAULT_RETRY = retry.Retry(
+    predicate=retry.if_transient_error,
+    initial=0.2,
+    maximum=4.0,
+    deadline=30.0,
+)
+
 class GCSService:
     """Google Cloud Storage サービス"""
     
@@ -43,20 +59,33 @@ class GCSService:
             logger.error(f"GCS サービス初期化エラー: {e}")
             raise
 
+    def _upload_json(self, file_path: str, data: Dict[str, Any]) -> None:
+        """JSONデータをGCSにアップロード（大きいペイロードはgzip圧縮）
+
+        保存形式はミニファイ済みJSON。pretty-printはバイト数を約2倍にする
+        だけで機械可読性には寄与しないため、人間向け整形は取得側で行う。
+        """
+        payload = orjson.dumps(data)
+        blob = self.bucket.blob(file_path)
+
+        if len(payload) >= MIN_GZIP_SIZE:
+            # Content-Encoding: gzip 付きで保存するとGCSは圧縮バイトを保持し、
+            # クライアントライブラリがGET時に透過的に展開する
+            blob.content_encoding = "gzip"
+            payload = gzip.compress(payload)
+
+        blob.upload_from_string(payload, content_type='application/json', retry=DEFAULT_RETRY)
+
     def create_folder(self, folder_name: str) -> bool:
-        """フォルダを作成（実際にはプレフィックスとして動作）"""
-        try:
-            # GCSではフォルダは概念的なもので、実際にはプレフィックス付きのオブジェクトを作成
-            folder_path = f"{folder_name}/.gitkeep"
-            blob = self.bucket.blob(folder_path)
-            blob.upload_from_string("")
-            
-            logger.info(f"GCSフォルダ作成完了: {folder_name}")
-            return True
-            
-        except Exception as e:
-            logger.error(f"GCSフォルダ作成エラー: {e}")
-            return False
+        """フォルダを作成（GCSでは何もアップロードする必要がない）
+
+        GCSにフォルダの実体はなく、キー付きオブジェクトを最初にアップロードした
+        時点でプレフィックスが「存在」する。以前は.gitkeepプレースホルダーを
+        アップロードしていたが、セッション作成ごとに不要なPUT（Class-A課金）を
+        発生させるだけなので廃止した。
+        """
+        logger.debug(f"GCSフォルダ作成はスキップ（プレフィックスは実データ保存時に生成）: {folder_name}")
+        return True
 
     def save_analysis_result(self, uuid: str, analysis_data: Dict[str, Any]) -> bool:
         """分析結果をJSONファイルとして保存"""
@@ -71,14 +100,10 @@ class GCSService:
             
             # ファイルパスを設定
             file_path = f"{uuid}/analysis_result.json"
-            
+
             # GCSに保存
-            blob = self.bucket.blob(file_path)
-            blob.upload_from_string(
-                json.dumps(enriched_data, ensure_ascii=False, indent=2),
-                content_type='application/json'
-            )
-            
+            self._upload_json(file_path, enriched_data)
+
             logger.info(f"分析結果保存完了: {file_path}")
             return True
             
@@ -97,7 +122,8 @@ class GCSService:
             blob = self.bucket.blob(file_path)
             blob.upload_from_string(
                 extracted_text,
-                content_type='text/plain; charset=utf-8'
+                content_type='text/plain; charset=utf-8',
+                retry=DEFAULT_RETRY
             )
             
             logger.info(f"抽出テキスト保存完了: {file_path}")
@@ -118,13 +144,9 @@ class GCSService:
             }
             
             file_path = f"{uuid}/request_info.json"
-            
-            blob = self.bucket.blob(file_path)
-            blob.upload_from_string(
-                json.dumps(request_info, ensure_ascii=False, indent=2),
-                content_type='application/json'
-            )
-            
+
+            self._upload_json(file_path, request_info)
+
             logger.info(f"リクエスト情報保存完了: {file_path}")
             return True
             
@@ -137,14 +159,18 @@ class GCSService:
         try:
             file_path = f"{uuid}/analysis_result.json"
             blob = self.bucket.blob(file_path)
-            
-            if not blob.exists():
+
+            # exists()の事前チェックはラウンドトリップが1回増えるだけなので、
+            # ダウンロードを直接実行してNotFoundを捕捉する
+            try:
+                content = blob.download_as_bytes(retry=DEFAULT_RETRY)
+            except NotFound:
                 logger.warning(f"分析結果が見つかりません: {file_path}")
                 return None
-            
-            content = blob.download_as_text()
-            return json.loads(content)
-            
+
+            # bytesのままorjsonでパースし、中間strの割り当てを回避
+            return orjson.loads(content)
+
         except Exception as e:
             logger.error(f"分析結果取得エラー: {e}")
             return None
@@ -158,7 +184,8 @@ class GCSService:
             blobs = self.client.list_blobs(
                 self.bucket_name, 
                 delimiter='/',
-                max_results=limit
+                max_results=limit,
+                retry=DEFAULT_RETRY
             )
             
             # プレフィックス（フォルダ）を取得するためには、pagesを反復する必要がある
@@ -221,7 +248,7 @@ class GCSService:
         """分析セッションを削除"""
         try:
             # UUIDフォルダ内のすべてのファイルを削除
-            blobs = self.client.list_blobs(self.bucket_name, prefix=f"{uuid}/")
+            blobs = self.client.list_blobs(self.bucket_name, prefix=f"{uuid}/", retry=DEFAULT_RETRY)
             
             deleted_count = 0
             for blob in blobs:
@@ -235,24 +262,47 @@ class GCSService:
             logger.error(f"分析セッション削除エラー: {e}")
             return False
 
+    def _scan_prefix(self, prefix: str) -> tuple:
+        """指定プレフィックス配下のblobを走査して統計を集計"""
+        total_size = 0
+        file_count = 0
+        sessions = set()
+
+        # fields指定で name/size のみ取得し、ページあたりの転送量を削減
+        blobs = self.client.list_blobs(
+            self.bucket_name,
+            prefix=prefix,
+            fields="items(name,size),nextPageToken",
+            retry=DEFAULT_RETRY
+        )
+
+        for blob in blobs:
+            total_size += blob.size or 0
+            file_count += 1
+
+            # UUIDを抽出してセッション数をカウント
+            path_parts = blob.name.split('/')
+            if len(path_parts) >= 2:
+                sessions.add(path_parts[0])
+
+        return total_size, file_count, sessions
+
     def get_storage_stats(self) -> Dict[str, Any]:
-        """ストレージ統計情報を取得"""
+        """ストレージ統計情報を取得（UUID先頭文字でシャーディングして並列走査）"""
         try:
-            blobs = self.client.list_blobs(self.bucket_name)
-            
+            # セッションフォルダはUUID（16進）始まりなので、先頭1文字でシャーディング
+            shards = list("0123456789abcdef")
+
             total_size = 0
             file_count = 0
             session_count = set()
-            
-            for blob in blobs:
-                total_size += blob.size or 0
-                file_count += 1
-                
-                # UUIDを抽出してセッション数をカウント
-                path_parts = blob.name.split('/')
-                if len(path_parts) >= 2:
-                    session_count.add(path_parts[0])
-            
+
+            with ThreadPoolExecutor(max_workers=16) as executor:
+                for shard_size, shard_count, shard_sessions in executor.map(self._scan_prefix, shards):
+                    total_size += shard_size
+                    file_count += shard_count
+                    session_count.update(shard_sessions)
+
             return {
                 "total_files": file_count,
                 "total_sessions": len(session_count),
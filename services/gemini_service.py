@@ -1,20 +1,161 @@
 # services/gemini_service.py (修正版)
 import google.generativeai as genai
 from config.settings import settings
+import asyncio
+import hashlib
+from copy import deepcopy
+from itertools import islice
 import logging
-import json
+import math
+import orjson
+import random
 import re
-from typing import Dict, Any, Optional
+import threading
+import time
+from collections import deque
+from string import Template
+from typing import AsyncIterator, Dict, Any, List, Optional, Tuple
+
+from cachetools import LRUCache, TTLCache
+from google.api_core import exceptions as gapi_exceptions
 
 logger = logging.getLogger(__name__)
 
+# 一時的なスロットリング・障害時にリトライ対象とする例外
+_RETRYABLE_EXCEPTIONS = (
+    gapi_exceptions.ResourceExhausted,    # 429 (RPM/TPMクォータ超過)
+    gapi_exceptions.ServiceUnavailable,   # 503
+    gapi_exceptions.DeadlineExceeded,     # タイムアウト
+)
+_MAX_RETRY_ATTEMPTS = 5
+_RETRY_MAX_WAIT = 30.0
+
+# レスポンスからJSONを抽出する正規表現（ホットパスのためモジュールロード時にコンパイル）
+_JSON_BLOCK_RE = re.compile(r'```json\s*(.*?)\s*```', re.DOTALL)
+_JSON_ANY_RE = re.compile(r'```\s*(\{.*?\})\s*```', re.DOTALL)
+
+# プロンプトの定型部分は毎回f-stringで組み立てず、モジュール定数として1回だけ構築する
+# JSONスキーマ部分はミニファイして埋め込む（入力トークンはレイテンシ・コストに直結するため、
+# 整形済みスキーマ+注意書きを送っていた旧版から入力トークンを大幅に削減。
+# 出力の妥当性はresponse_mime_type="application/json"のJSONモードで担保する）
+_JSON_PROMPT_HEAD = """
+以下の物件情報を分析し、指定のJSON構造で回答してください。不明な項目はnull、overall_ratingは1-5の整数。
+
+"""
+
+_JSON_PROMPT_TAIL = """
+
+JSON構造:
+{"basic_info":{"property_name":"物件名","address":"住所","room_number":"部屋番号","rent":"家賃","management_fee":"管理費","deposit":"敷金","key_money":"礼金","area":"面積","layout":"間取り","building_age":"築年数","floor":"階数","direction":"向き","building_type":"建物種別"},"features":{"amenities":["設備"],"equipment":["備品"],"special_features":["特徴"]},"location":{"nearest_stations":[{"line":"路線名","station":"駅名","walking_time":"徒歩X分"}],"surrounding_environment":"周辺環境の説明"},"evaluation":{"advantages":["メリット"],"disadvantages":["デメリット"],"overall_rating":5,"recommendation_score":"★★★★☆ (4/5)","summary":"総合的な評価とおすすめポイント"}}
+"""
+
+_TEXT_PROMPT_TMPL = Template("""
+以下の${analysis_type}について、詳細な物件分析を行ってください。
+
+${content}
+
+以下の構成で分析してください：
+
+## 物件分析
+
+**1. 物件の基本情報**
+- 物件名、住所、価格、面積、間取り、築年数など
+
+**2. 物件の特徴・設備**
+- 設備、特徴、利便性など
+
+**3. 立地条件**
+- 最寄り駅、アクセス、周辺環境など
+
+**4. この物件のメリット・デメリット**
+- 良い点と注意点
+
+**5. 総合的な評価とおすすめ度**
+- 総合評価と★での評価（5段階）
+
+詳細で具体的な分析をお願いします。
+""")
+
+_FINANCIAL_PROMPT_TMPL = Template("""
+以下の住所の財務状況を検索結果をもとに分析し、指定のJSON構造で回答してください。
+
+**住所**: ${address}
+
+**検索結果からの関連情報**:
+${search_content}
+
+JSON構造（financial_statusは良い/悪い/普通、confidence_levelはhigh/medium/low、analysis_summaryは200文字程度）:
+{"financial_status":"普通","overall_score":85,"analysis_summary":"財務状況の概要","positive_factors":[{"factor":"良い要因のタイトル","description":"詳細な説明","evidence":"根拠となるデータや数値"}],"negative_factors":[{"factor":"悪い要因のタイトル","description":"詳細な説明","evidence":"根拠となるデータや数値"}],"financial_indicators":{"revenue_total":"歳入総額","expenditure_total":"歳出総額","debt_ratio":"実質公債費比率などの債務指標"},"data_reliability":{"data_sources":${num_sources},"confidence_level":"high"}}
+""")
+
+# 財務分析プロンプトに含める検索スニペット1件あたりの上限文字数
+_MAX_SNIPPET_CHARS = 500
+
+
+def _truncate_input(text: str, max_chars: int) -> str:
+    """入力テキストを上限文字数に収める
+
+    物件ページ由来のテキストは冒頭（物件概要）と末尾（詳細表）に情報が
+    集中しやすいため、超過時は中間を省略して先頭・末尾を残す。
+    """
+    if len(text) <= max_chars:
+        return text
+    half = max_chars // 2
+    return f"{text[:half]}\n…（中略）…\n{text[-half:]}"
+
+
+# シングルトン管理。動作確認済みモデル名もプロセス内で保持し、
+# 再インスタンス化時のモデルプローブループをスキップする
+_working_model_name: Optional[str] = None
+_instance: Optional["GeminiService"] = None
+_instance_lock = threading.Lock()
+
+
+def get_gemini_service() -> "GeminiService":
+    """GeminiServiceのシングルトンを取得（初回アクセス時のみ初期化）"""
+    global _instance
+    if _instance is None:
+        with _instance_lock:
+            if _instance is None:
+                _instance = GeminiService()
+    return _instance
+
+
 class GeminiService:
     """Google Gemini AI サービス"""
     
     def __init__(self):
         """サービス初期化"""
         try:
-            genai.configure(api_key=settings.GOOGLE_API_KEY)
+            # gRPCトランスポートを明示指定。チャネルはプロセス内で共有・再利用され、
+            # リクエストごとのTCP+TLSハンドシェイクを回避できる
+            genai.configure(api_key=settings.GOOGLE_API_KEY, transport="grpc")
+
+            # Vertexのクォータを超えないよう同時実行数を制限
+            self._sem = asyncio.Semaphore(settings.GEMINI_MAX_CONCURRENCY)
+
+            # クライアント側RPMリミッター（スライディングウィンドウ）。
+            # クォータ手前で自主的に待つことで429とそのリトライ待ちを未然に防ぐ
+            self._request_times: deque = deque()
+            self._rpm_lock = asyncio.Lock()
+
+            # 同一プロンプトの分析結果キャッシュ（同じ物件URL/名の再分析でAPI呼び出しを省略）
+            self._cache: Optional[TTLCache] = (
+                TTLCache(maxsize=1024, ttl=settings.GEMINI_CACHE_TTL)
+                if settings.ENABLE_GEMINI_CACHE else None
+            )
+            # キャッシュ効果の観測用カウンタ
+            self.cache_stats = {"hits": 0, "misses": 0}
+
+            # 実行中の同一プロンプト呼び出しを集約するシングルフライト用テーブル
+            self._inflight: Dict[Tuple[str, bool, bool], asyncio.Future] = {}
+
+            # セマンティックキャッシュ（表記ゆれした同一住所・物件名をヒットさせる）
+            # キー: (種別, エンティティ文字列) → (埋め込みベクトル, 分析結果)
+            self._semantic_cache: Optional[LRUCache] = (
+                LRUCache(maxsize=1024)
+                if settings.ENABLE_GEMINI_SEMANTIC_CACHE else None
+            )
             
             # 現在利用可能なモデル名を試行
             model_names = [
@@ -23,17 +164,51 @@ class GeminiService:
                 'gemini-1.0-pro',        # 従来モデル
                 'gemini-pro',            # 旧モデル名
             ]
-            
+
+            # 以前の初期化で判明した動作モデル名があれば先頭で試し、プローブループをスキップ
+            global _working_model_name
+            if _working_model_name in model_names:
+                model_names.remove(_working_model_name)
+                model_names.insert(0, _working_model_name)
+
             self.model = None
+            self.json_model = None
             for model_name in model_names:
                 try:
                     self.model = genai.GenerativeModel(model_name)
+                    # JSON分析用のモデル。JSONモードではスキーマ逸脱やフェンス付き出力が
+                    # 起きないため、プロンプト内の長い注意書きを省略できる
+                    self.json_model = genai.GenerativeModel(
+                        model_name,
+                        generation_config={"response_mime_type": "application/json"}
+                    )
+                    _working_model_name = model_name
                     logger.info(f"Gemini サービス初期化完了 - モデル: {model_name}")
                     break
                 except Exception as e:
                     logger.warning(f"モデル {model_name} の初期化に失敗: {e}")
                     continue
             
+            # バックグラウンド用途（財務分析など）のモデルルーティング。
+            # ユーザー対面パスは上で選んだ低レイテンシモデル、オフライン寄りの
+            # パスはGEMINI_BACKGROUND_MODELで安価なモデルに振り分けられる
+            self.background_json_model = None
+            if settings.GEMINI_BACKGROUND_MODEL:
+                try:
+                    self.background_json_model = genai.GenerativeModel(
+                        settings.GEMINI_BACKGROUND_MODEL,
+                        generation_config={"response_mime_type": "application/json"}
+                    )
+                    logger.info(f"バックグラウンド用モデル初期化完了: {settings.GEMINI_BACKGROUND_MODEL}")
+                except Exception as e:
+                    logger.warning(f"バックグラウンド用モデルの初期化に失敗（通常モデルを使用）: {e}")
+
+            # JSON分析の定型指示（スキーマ）をサーバー側にピン留めするコンテキストキャッシュ。
+            # 成功時はプロンプトに可変部分だけを送ればよく、TTFTとトークンコストが下がる
+            self.context_cached_model = None
+            if settings.ENABLE_GEMINI_CONTEXT_CACHE and self.model is not None:
+                self._init_context_cache()
+
             if self.model is None:
                 # 利用可能なモデルを取得して表示
                 try:
@@ -49,109 +224,253 @@ class GeminiService:
             logger.error(f"Gemini サービス初期化エラー: {e}")
             raise
 
+    def _init_context_cache(self) -> None:
+        """JSON分析の定型指示をGeminiのコンテキストキャッシュに登録
+
+        キャッシュ対象には最小トークン数の制限があるため、作成に失敗した場合は
+        警告ログのみ出して通常のプロンプト連結にフォールバックする。
+        """
+        try:
+            from google.generativeai import caching
+            import datetime as _dt
+
+            cached_content = caching.CachedContent.create(
+                model=self.model.model_name,
+                display_name="property-analysis-schema",
+                system_instruction="".join((_JSON_PROMPT_HEAD, _JSON_PROMPT_TAIL)),
+                ttl=_dt.timedelta(seconds=settings.GEMINI_CONTEXT_CACHE_TTL),
+            )
+            self.context_cached_model = genai.GenerativeModel.from_cached_content(cached_content)
+            logger.info("Geminiコンテキストキャッシュ作成完了")
+        except Exception as e:
+            logger.warning(f"コンテキストキャッシュ作成に失敗（通常プロンプトにフォールバック）: {e}")
+            self.context_cached_model = None
+
     def _get_json_prompt(self, content: str, is_url_analysis: bool = True) -> str:
         """JSON形式での分析用プロンプト"""
-        base_prompt = f"""
-以下の物件情報を分析して、必ずJSON形式で回答してください。
-
-{content}
-
-以下のJSON構造で回答してください：
-
-{{
-    "basic_info": {{
-        "property_name": "物件名",
-        "address": "住所",
-        "room_number": "部屋番号（わかる場合）",
-        "rent": "家賃",
-        "management_fee": "管理費",
-        "deposit": "敷金",
-        "key_money": "礼金",
-        "area": "面積",
-        "layout": "間取り",
-        "building_age": "築年数",
-        "floor": "階数",
-        "direction": "向き",
-        "building_type": "建物種別"
-    }},
-    "features": {{
-        "amenities": ["設備1", "設備2", "設備3"],
-        "equipment": ["備品1", "備品2"],
-        "special_features": ["特徴1", "特徴2"]
-    }},
-    "location": {{
-        "nearest_stations": [
-            {{"line": "路線名", "station": "駅名", "walking_time": "徒歩X分"}},
-            {{"line": "路線名", "station": "駅名", "walking_time": "徒歩X分"}}
-        ],
-        "surrounding_environment": "周辺環境の説明"
-    }},
-    "evaluation": {{
-        "advantages": ["メリット1", "メリット2", "メリット3"],
-        "disadvantages": ["デメリット1", "デメリット2"],
-        "overall_rating": 5,
-        "recommendation_score": "★★★★☆ (4/5)",
-        "summary": "総合的な評価とおすすめポイント"
-    }}
-}}
-
-注意事項：
-- 情報が不明な場合はnullを設定
-- JSON形式以外の文字は含めない
-- 必ず有効なJSONとして回答
-- 数値は適切な型で設定（文字列の場合は引用符で囲む）
-- overall_ratingは1-5の整数
-"""
-        return base_prompt
+        if self.context_cached_model is not None:
+            # 定型指示はサーバー側キャッシュに載っているので可変部分のみ送る
+            return content
+        # 定型部分はモジュール定数なので、可変部分を挟んで連結するだけで済む
+        return "".join((_JSON_PROMPT_HEAD, content, _JSON_PROMPT_TAIL))
 
     def _get_text_prompt(self, content: str, is_url_analysis: bool = True) -> str:
         """テキスト形式での分析用プロンプト"""
         analysis_type = "URLから取得した物件情報" if is_url_analysis else "物件名"
-        
-        return f"""
-以下の{analysis_type}について、詳細な物件分析を行ってください。
+        return _TEXT_PROMPT_TMPL.substitute(analysis_type=analysis_type, content=content)
 
-{content}
+    def _cache_key(self, prompt: str) -> bytes:
+        """(モデル名, プロンプト)からキャッシュキーを生成"""
+        return hashlib.blake2b(
+            (self.model.model_name + prompt).encode("utf-8"), digest_size=16
+        ).digest()
 
-以下の構成で分析してください：
+    def _cache_get(self, key: bytes) -> Optional[Dict[str, Any]]:
+        """キャッシュから分析結果を取得
 
-## 物件分析
+        呼び出し側（/analyzeの財務分析統合など）は返却されたdictを
+        書き換えるため、キャッシュ本体を汚染しないようコピーを返す。
+        """
+        if self._cache is None:
+            return None
+        cached = self._cache.get(key)
+        if cached is not None:
+            self.cache_stats["hits"] += 1
+            return deepcopy(cached)
+        self.cache_stats["misses"] += 1
+        return None
 
-**1. 物件の基本情報**
-- 物件名、住所、価格、面積、間取り、築年数など
+    def _cache_set(self, key: bytes, result: Dict[str, Any]) -> None:
+        """解析に成功した分析結果のみキャッシュに保存（コピーを保存）"""
+        if self._cache is not None and "error" not in result:
+            self._cache[key] = deepcopy(result)
 
-**2. 物件の特徴・設備**
-- 設備、特徴、利便性など
+    async def _embed(self, text: str) -> Optional[List[float]]:
+        """エンティティ文字列の埋め込みベクトルを取得（失敗時はNone）
 
-**3. 立地条件**
-- 最寄り駅、アクセス、周辺環境など
+        genai.embed_contentは同期のネットワーク呼び出しのため、
+        イベントループを塞がないようワーカースレッドで実行する。
+        """
+        try:
+            result = await asyncio.to_thread(
+                genai.embed_content,
+                model=settings.GEMINI_EMBEDDING_MODEL,
+                content=text,
+            )
+            return result["embedding"]
+        except Exception as e:
+            logger.warning(f"埋め込み生成に失敗（セマンティックキャッシュをスキップ）: {e}")
+            return None
 
-**4. この物件のメリット・デメリット**
-- 良い点と注意点
+    @staticmethod
+    def _cosine_similarity(a: List[float], b: List[float]) -> float:
+        """2つのベクトルのコサイン類似度"""
+        dot = sum(x * y for x, y in zip(a, b))
+        norm_a = math.sqrt(sum(x * x for x in a))
+        norm_b = math.sqrt(sum(x * x for x in b))
+        if not norm_a or not norm_b:
+            return 0.0
+        return dot / (norm_a * norm_b)
 
-**5. 総合的な評価とおすすめ度**
-- 総合評価と★での評価（5段階）
+    async def _semantic_get(self, kind: str, entity: str) -> Tuple[Optional[Dict[str, Any]], Optional[List[float]]]:
+        """表記ゆれを許容してキャッシュ済み分析結果を検索
 
-詳細で具体的な分析をお願いします。
-"""
+        Returns:
+            (キャッシュされた結果 or None, エンティティの埋め込みベクトル or None)
+        """
+        if self._semantic_cache is None:
+            return None, None
+
+        vector = await self._embed(entity)
+        if vector is None:
+            return None, None
+
+        best_score = 0.0
+        best_result = None
+        for (cached_kind, _), (cached_vector, cached_result) in list(self._semantic_cache.items()):
+            if cached_kind != kind:
+                continue
+            score = self._cosine_similarity(vector, cached_vector)
+            if score > best_score:
+                best_score = score
+                best_result = cached_result
+
+        if best_result is not None and best_score >= settings.GEMINI_SEMANTIC_CACHE_THRESHOLD:
+            logger.info(f"セマンティックキャッシュヒット ({kind}): {entity} (類似度: {best_score:.3f})")
+            # 呼び出し側の書き換えがキャッシュに波及しないようコピーを返す
+            return deepcopy(best_result), vector
+        return None, vector
+
+    def _semantic_set(self, kind: str, entity: str, vector: Optional[List[float]],
+                      result: Dict[str, Any]) -> None:
+        """分析結果をセマンティックキャッシュに保存（コピーを保存）"""
+        if self._semantic_cache is not None and vector is not None and "error" not in result:
+            self._semantic_cache[(kind, entity)] = (vector, deepcopy(result))
+
+    async def _generate(self, prompt: str, json_mode: bool = False, background: bool = False,
+                        use_context_cache: bool = False) -> str:
+        """Gemini API呼び出し（シングルフライト付き）
+
+        同一プロンプトが並行して来た場合、最初の1件だけが実際にAPIを呼び、
+        残りは同じFutureを待つ。バースト時の重複呼び出しを集約できる。
+        """
+        key = (prompt, json_mode, background, use_context_cache)
+        existing = self._inflight.get(key)
+        if existing is not None:
+            logger.info("同一プロンプトの実行中リクエストに合流（シングルフライト）")
+            return await existing
+
+        fut: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = fut
+        try:
+            text = await self._generate_once(prompt, json_mode, background, use_context_cache)
+        except Exception as e:
+            fut.set_exception(e)
+            fut.exception()  # 待機者がいない場合の「例外未回収」警告を抑制
+            raise
+        else:
+            fut.set_result(text)
+            return text
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _acquire_rpm_slot(self) -> None:
+        """GEMINI_RPM_LIMIT設定時、直近60秒の呼び出し数が上限未満になるまで待つ"""
+        if settings.GEMINI_RPM_LIMIT <= 0:
+            return
+        while True:
+            async with self._rpm_lock:
+                now = time.monotonic()
+                while self._request_times and now - self._request_times[0] >= 60.0:
+                    self._request_times.popleft()
+                if len(self._request_times) < settings.GEMINI_RPM_LIMIT:
+                    self._request_times.append(now)
+                    return
+                wait = 60.0 - (now - self._request_times[0])
+            logger.info(f"RPM上限に到達、{wait:.1f}秒待機")
+            await asyncio.sleep(wait)
+
+    async def _generate_once(self, prompt: str, json_mode: bool = False, background: bool = False,
+                             use_context_cache: bool = False) -> str:
+        """Gemini API呼び出し（SDKの非同期インターフェースを使用）
+
+        セマフォで同時実行数を制限しつつ、generate_content_asyncで
+        イベントループをブロックせずに複数リクエストを並行処理できる。
+        json_mode=Trueの場合はresponse_mime_type="application/json"付きの
+        モデルを使い、生JSONを返させる。background=Trueのパスは
+        GEMINI_BACKGROUND_MODEL設定時にそちらへルーティングされる。
+        コンテキストキャッシュのsystem_instructionは物件分析スキーマ固定の
+        ため、use_context_cache=Trueの物件分析パスでのみ使用する
+        （財務分析に使うとスキーマの指示が衝突する）。
+        """
+        if json_mode:
+            if background and self.background_json_model is not None:
+                model = self.background_json_model
+            elif use_context_cache and self.context_cached_model is not None:
+                model = self.context_cached_model
+            else:
+                model = self.json_model
+        else:
+            model = self.model
+
+        # 429/503/タイムアウトはジッター付き指数バックオフでリトライする。
+        # リトライなしだと一時的なスロットリング1回でリクエスト全体が失敗する
+        for attempt in range(_MAX_RETRY_ATTEMPTS):
+            try:
+                async with self._sem:
+                    await self._acquire_rpm_slot()
+                    response = await model.generate_content_async(prompt)
+                return response.text
+            except _RETRYABLE_EXCEPTIONS as e:
+                if attempt >= _MAX_RETRY_ATTEMPTS - 1:
+                    raise
+                # ジッターでリトライの同期（サンダリングハード）を避ける
+                wait = min((2 ** attempt) * (0.5 + random.random()), _RETRY_MAX_WAIT)
+                logger.warning(f"Gemini API一時エラー、{wait:.1f}秒後にリトライ ({attempt + 1}/{_MAX_RETRY_ATTEMPTS}): {e}")
+                await asyncio.sleep(wait)
+
+    async def stream_property_analysis(self, content: str, is_url_analysis: bool = True) -> AsyncIterator[str]:
+        """物件分析をストリーミング実行し、生成済みテキスト片を逐次返す
+
+        全文生成を待たずに最初のトークンから返せるため、対話的な呼び出し元の
+        体感レイテンシが大きく下がる。部分表示が前提のためテキスト形式
+        プロンプトを使用する。
+        """
+        # 非ストリーミングパスと同様、入力は上限文字数で打ち切る
+        if content and len(content) > settings.GEMINI_MAX_INPUT_CHARS:
+            logger.info(f"入力テキストを{settings.GEMINI_MAX_INPUT_CHARS}文字に切り詰め（元: {len(content)}文字）")
+            content = _truncate_input(content, settings.GEMINI_MAX_INPUT_CHARS)
+
+        prompt = self._get_text_prompt(content, is_url_analysis=is_url_analysis)
+        async with self._sem:
+            response = await self.model.generate_content_async(prompt, stream=True)
+            async for chunk in response:
+                if chunk.text:
+                    yield chunk.text
 
     def _parse_json_response(self, response_text: str) -> Dict[str, Any]:
         """JSONレスポンスをパース"""
         try:
-            # JSONブロックを抽出（```json...```の場合）
-            json_match = re.search(r'```json\s*(.*?)\s*```', response_text, re.DOTALL)
+            # JSONモードのレスポンスは生JSONなので、まず直接パースを試みる
+            try:
+                parsed = orjson.loads(response_text)
+                logger.info("JSONレスポンスのパースに成功")
+                return parsed
+            except orjson.JSONDecodeError:
+                pass
+
+            # フォールバック: ```json...```または```...```ブロックから抽出
+            json_match = _JSON_BLOCK_RE.search(response_text) or _JSON_ANY_RE.search(response_text)
             if json_match:
                 json_text = json_match.group(1)
             else:
-                # 直接JSONの場合
                 json_text = response_text.strip()
-            
-            # JSONをパース
-            parsed = json.loads(json_text)
+
+            parsed = orjson.loads(json_text)
             logger.info("JSONレスポンスのパースに成功")
             return parsed
-            
-        except json.JSONDecodeError as e:
+
+        except orjson.JSONDecodeError as e:
             logger.error(f"JSONパースエラー: {e}")
             logger.error(f"レスポンステキスト: {response_text[:500]}...")
             
@@ -173,27 +492,45 @@ class GeminiService:
                 "raw_response": response_text
             }
 
-    def analyze_property_from_url(self, extracted_text: str, response_format: str = "json") -> Dict[str, Any]:
+    async def analyze_property_from_url(self, extracted_text: str, response_format: str = "json") -> Dict[str, Any]:
         """URLから抽出したテキストを基に物件分析"""
         try:
+            # 入力トークンはレイテンシ・コストに直結するため上限文字数で打ち切る
+            if extracted_text and len(extracted_text) > settings.GEMINI_MAX_INPUT_CHARS:
+                logger.info(f"入力テキストを{settings.GEMINI_MAX_INPUT_CHARS}文字に切り詰め（元: {len(extracted_text)}文字）")
+                extracted_text = _truncate_input(extracted_text, settings.GEMINI_MAX_INPUT_CHARS)
+
             if response_format.lower() == "json":
                 prompt = self._get_json_prompt(extracted_text, is_url_analysis=True)
             else:
                 prompt = self._get_text_prompt(extracted_text, is_url_analysis=True)
-            
+
+            cache_key = self._cache_key(prompt)
+            cached = self._cache_get(cache_key)
+            if cached is not None:
+                logger.info("Gemini分析キャッシュヒット (URL)")
+                return cached
+
             logger.info(f"Gemini分析開始 (URL) - 形式: {response_format}")
-            response = self.model.generate_content(prompt)
-            response_text = response.text
-            
+            response_text = await self._generate(
+                prompt, json_mode=response_format.lower() == "json", use_context_cache=True
+            )
+
             if response_format.lower() == "json":
-                return self._parse_json_response(response_text)
+                result = self._parse_json_response(response_text)
+                # パースに失敗したフォールバック結果はキャッシュしない
+                if "raw_response" not in result:
+                    self._cache_set(cache_key, result)
             else:
-                return {
+                result = {
                     "basic_info": {"property_name": "URL分析"},
                     "evaluation": {"summary": response_text},
                     "raw_response": response_text
                 }
-                
+                self._cache_set(cache_key, result)
+            return result
+
+
         except Exception as e:
             logger.error(f"Gemini URL分析エラー: {e}")
             return {
@@ -202,29 +539,50 @@ class GeminiService:
                 "error": str(e)
             }
 
-    def analyze_property_by_name(self, property_name: str, response_format: str = "json") -> Dict[str, Any]:
+    async def analyze_property_by_name(self, property_name: str, response_format: str = "json") -> Dict[str, Any]:
         """物件名から分析"""
         try:
             content = f"物件名: {property_name}"
-            
+
             if response_format.lower() == "json":
                 prompt = self._get_json_prompt(content, is_url_analysis=False)
             else:
                 prompt = self._get_text_prompt(content, is_url_analysis=False)
-            
+
+            cache_key = self._cache_key(prompt)
+            cached = self._cache_get(cache_key)
+            if cached is not None:
+                logger.info("Gemini分析キャッシュヒット (物件名)")
+                return cached
+
+            # 表記ゆれ（「新宿区西新宿」vs「西新宿, 新宿区」等）を類似度で吸収
+            semantic_kind = f"property_name:{response_format.lower()}"
+            semantic_hit, entity_vector = await self._semantic_get(semantic_kind, property_name)
+            if semantic_hit is not None:
+                return semantic_hit
+
             logger.info(f"Gemini分析開始 (物件名) - 形式: {response_format}")
-            response = self.model.generate_content(prompt)
-            response_text = response.text
-            
+            response_text = await self._generate(
+                prompt, json_mode=response_format.lower() == "json", use_context_cache=True
+            )
+
             if response_format.lower() == "json":
-                return self._parse_json_response(response_text)
+                result = self._parse_json_response(response_text)
+                # パースに失敗したフォールバック結果はキャッシュしない
+                if "raw_response" not in result:
+                    self._cache_set(cache_key, result)
+                    self._semantic_set(semantic_kind, property_name, entity_vector, result)
             else:
-                return {
+                result = {
                     "basic_info": {"property_name": property_name},
                     "evaluation": {"summary": response_text},
                     "raw_response": response_text
                 }
-                
+                self._cache_set(cache_key, result)
+                self._semantic_set(semantic_kind, property_name, entity_vector, result)
+            return result
+
+
         except Exception as e:
             logger.error(f"Gemini 物件名分析エラー: {e}")
             return {
@@ -233,7 +591,51 @@ class GeminiService:
                 "error": str(e)
             }
 
-    def analyze_financial_status(self, address: str, search_results: dict) -> dict:
+    async def analyze_properties_batch(self, property_names: List[str], response_format: str = "json",
+                                       max_concurrency: int = 10) -> List[Dict[str, Any]]:
+        """複数物件の分析を並行実行
+
+        Args:
+            property_names: 分析対象の物件名リスト
+            response_format: レスポンス形式（json/text）
+            max_concurrency: 同時実行数の上限
+
+        Returns:
+            入力順を保った分析結果のリスト
+        """
+        sem = asyncio.Semaphore(max_concurrency)
+
+        async def _bounded(name: str) -> Dict[str, Any]:
+            async with sem:
+                return await self.analyze_property_by_name(name, response_format)
+
+        return list(await asyncio.gather(*(_bounded(name) for name in property_names)))
+
+    async def analyze_financial_status_batch(self, items: List[Tuple[str, dict]],
+                                             max_concurrency: int = 10) -> List[dict]:
+        """複数住所の財務分析を一括実行（非リアルタイム用途向け）
+
+        本来はGeminiのBatch API（24h SLA・50%割引）に投げたいが、現行の
+        google-generativeai SDKはBatch APIを提供していないため、同時実行数を
+        制限した並行呼び出しで代替している。SDK更新時の移行ポイント。
+
+        Args:
+            items: (住所, Vertex AI Search検索結果) のタプルのリスト
+
+        Returns:
+            入力順を保った財務分析結果のリスト
+        """
+        sem = asyncio.Semaphore(max_concurrency)
+
+        async def _bounded(address: str, search_results: dict) -> dict:
+            async with sem:
+                return await self.analyze_financial_status(address, search_results)
+
+        return list(await asyncio.gather(
+            *(_bounded(address, results) for address, results in items)
+        ))
+
+    async def analyze_financial_status(self, address: str, search_results: dict) -> dict:
         """
         住所の財務状況を分析
         
@@ -245,81 +647,60 @@ class GeminiService:
             dict: 財務分析結果
         """
         try:
-            # 検索結果からコンテンツを抽出
+            results = search_results.get("results") or []
+            n_sources = len(results)
+
+            # 検索結果からコンテンツを抽出（上位5件、ジェネレータで中間リストを作らない）
             search_content = ""
-            if search_results.get("search_successful") and search_results.get("results"):
-                search_content = "\n\n".join([
-                    f"【{result.get('title', 'タイトルなし')}】\n{result.get('snippet', result.get('content', ''))}"
-                    for result in search_results["results"][:5]  # 上位5件使用
-                ])
-            
-            # プロンプトを構築
-            prompt = f"""
-以下の住所の財務状況について、検索結果をもとに詳細に分析してください。
+            if search_results.get("search_successful") and results:
+                search_content = "\n\n".join(
+                    f"【{result.get('title') or 'タイトルなし'}】\n"
+                    f"{(result.get('snippet') or result.get('content') or '')[:_MAX_SNIPPET_CHARS]}"
+                    for result in islice(results, 5)
+                )
 
-**住所**: {address}
+            # プロンプトを構築（定型部分はモジュール定数のテンプレートを使用）
+            prompt = _FINANCIAL_PROMPT_TMPL.substitute(
+                address=address,
+                search_content=search_content if search_content else "関連情報が見つかりませんでした。",
+                num_sources=n_sources
+            )
 
-**検索結果からの関連情報**:
-{search_content if search_content else "関連情報が見つかりませんでした。"}
-
-**分析要求**:
-上記の検索結果を詳細に分析し、以下のJSON形式で財務状況を評価してください。
-
-**回答形式**（必ずこの形式のJSONで回答してください）:
-```json
-{{
-    "financial_status": "良い/悪い/普通",
-    "overall_score": 85,
-    "analysis_summary": "財務状況の概要（200文字程度）",
-    "positive_factors": [
-        {{
-            "factor": "良い要因のタイトル",
-            "description": "詳細な説明",
-            "evidence": "根拠となるデータや数値"
-        }}
-    ],
-    "negative_factors": [
-        {{
-            "factor": "悪い要因のタイトル", 
-            "description": "詳細な説明",
-            "evidence": "根拠となるデータや数値"
-        }}
-    ],
-    "financial_indicators": {{
-        "revenue_total": "歳入総額（判明している場合）",
-        "expenditure_total": "歳出総額（判明している場合）",
-        "debt_ratio": "実質公債費比率などの債務指標"
-    }},
-    "data_reliability": {{
-        "data_sources": {len(search_results.get('results', []))},
-        "confidence_level": "high/medium/low"
-    }}
-}}
-```
-"""
+            cache_key = self._cache_key(prompt)
+            cached = self._cache_get(cache_key)
+            if cached is not None:
+                logger.info(f"財務分析キャッシュヒット: {address}")
+                return cached
+
+            # 住所の表記ゆれを類似度で吸収
+            semantic_hit, entity_vector = await self._semantic_get("financial", address)
+            if semantic_hit is not None:
+                return semantic_hit
 
             logger.info(f"財務分析開始: {address}")
-            
-            response = self.model.generate_content(prompt)
-            response_text = response.text.strip()
+
+            response_text = (await self._generate(prompt, json_mode=True, background=True)).strip()
             
             # JSONの抽出と解析
             try:
-                # ```json と ``` で囲まれた部分を抽出
-                if "```json" in response_text:
-                    json_start = response_text.find("```json") + 7
-                    json_end = response_text.find("```", json_start)
-                    json_text = response_text[json_start:json_end].strip()
-                else:
-                    # JSON部分を探す
-                    json_start = response_text.find("{")
-                    json_end = response_text.rfind("}") + 1
-                    if json_start >= 0 and json_end > json_start:
-                        json_text = response_text[json_start:json_end]
+                # JSONモードのレスポンスは生JSONなので、まず直接パースを試みる
+                try:
+                    financial_analysis = orjson.loads(response_text)
+                except orjson.JSONDecodeError:
+                    # フォールバック: ```json と ``` で囲まれた部分を抽出（コンパイル済み正規表現を使用）
+                    json_match = _JSON_BLOCK_RE.search(response_text) or _JSON_ANY_RE.search(response_text)
+                    if json_match:
+                        json_text = json_match.group(1)
                     else:
-                        json_text = response_text
-                
-                financial_analysis = json.loads(json_text)
+                        # JSON部分を探す
+                        json_start = response_text.find("{")
+                        json_end = response_text.rfind("}") + 1
+                        if json_start >= 0 and json_end > json_start:
+                            json_text = response_text[json_start:json_end]
+                        else:
+                            json_text = response_text
+
+                    financial_analysis = orjson.loads(json_text)
                 
                 # 基本的な検証とデフォルト値の設定
                 required_fields = {
@@ -338,15 +719,18 @@ class GeminiService:
                 
                 # データ信頼性情報を自動設定
                 financial_analysis["data_reliability"].update({
-                    "data_sources": len(search_results.get('results', [])),
+                    "data_sources": n_sources,
                     "search_successful": search_results.get("search_successful", False),
                     "vertex_ai_search_used": True
                 })
                 
                 logger.info(f"財務分析完了: {address} - {financial_analysis.get('financial_status')}")
+                # JSONパースに成功した結果のみキャッシュ
+                self._cache_set(cache_key, financial_analysis)
+                self._semantic_set("financial", address, entity_vector, financial_analysis)
                 return financial_analysis
                 
-            except json.JSONDecodeError as e:
+            except orjson.JSONDecodeError as e:
                 logger.error(f"JSON解析エラー: {e}")
                 return {
                     "financial_status": "分析中",
@@ -356,7 +740,7 @@ class GeminiService:
                     "negative_factors": [],
                     "financial_indicators": {},
                     "data_reliability": {
-                        "data_sources": len(search_results.get('results', [])),
+                        "data_sources": n_sources,
                         "confidence_level": "low",
                         "limitations": "JSON解析エラーが発生しました"
                     }
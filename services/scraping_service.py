@@ -1,29 +1,155 @@
+import hashlib
+import re
 import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urlparse
+from cachetools import LRUCache, TTLCache
+from concurrent.futures import ThreadPoolExecutor
+from threading import RLock
+from typing import List, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from bs4 import BeautifulSoup, SoupStrainer
 import logging
 from config.settings import settings
 from services.text_compression_service import TextCompressionService
 
+# selectolax（Lexborエンジン）はテキスト抽出用途でBS4より10倍以上高速。
+# 未インストール環境ではBeautifulSoup + lxmlにフォールバックする
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
 logger = logging.getLogger(__name__)
 
+# 除去対象のタグとノイズ要素のclass名
+_NOISE_TAGS = ['script', 'style', 'nav', 'header', 'footer', 'aside', 'iframe', 'noscript']
+_NOISE_CLASSES = ['advertisement', 'ads', 'banner', 'popup', 'modal', 'cookie', 'privacy']
+_NOISE_TAG_SELECTOR = ','.join(_NOISE_TAGS)
+
+# BS4フォールバック時、テキスト抽出に使わない<head>以下を最初からパースしない
+_BODY_STRAINER = SoupStrainer('body')
+
+# ホットパスで使う正規表現はモジュールロード時にコンパイルしておく
+_WS_RE = re.compile(r'\s+')
+
+# URL判定用（scheme + netloc の存在チェックをurlparseより軽量に行う）
+_URL_RE = re.compile(r'^https?://[^\s/$.?#].[^\s]*$', re.IGNORECASE)
+
+# 除去対象の定型文字列パターン
+_UNWANTED_PATTERNS = [
+    r'Cookie.*?設定',
+    r'プライバシーポリシー',
+    r'利用規約',
+    r'サイトマップ',
+    r'ページトップ',
+    r'メニュー',
+    r'ナビゲーション',
+    r'フッター',
+    r'ヘッダー',
+    r'広告',
+    r'PR',
+    r'スポンサー',
+    r'関連記事',
+    r'おすすめ',
+    r'人気記事',
+    r'ランキング',
+    r'タグ:',
+    r'カテゴリ:',
+    r'投稿日:',
+    r'更新日:',
+    r'作成者:',
+    r'シェア',
+    r'ツイート',
+    r'いいね',
+    r'コメント',
+    r'購読',
+    r'登録',
+    r'ログイン',
+    r'ログアウト',
+    r'マイページ',
+    r'お気に入り',
+    r'ブックマーク',
+]
+# 1パターンずつsubすると全文走査がパターン数分発生するため、1つの選択肢に結合して1パスで除去
+_UNWANTED_UNION_RE = re.compile('|'.join(f'(?:{p})' for p in _UNWANTED_PATTERNS), re.IGNORECASE)
+
+# 物件情報のキーワードパターン
+_PROPERTY_PATTERNS = [
+    r'物件名[：:\s]*[^\n]+',
+    r'住所[：:\s]*[^\n]+',
+    r'価格[：:\s]*[^\n]+',
+    r'賃料[：:\s]*[^\n]+',
+    r'家賃[：:\s]*[^\n]+',
+    r'面積[：:\s]*[^\n]+',
+    r'間取り[：:\s]*[^\n]+',
+    r'築年数[：:\s]*[^\n]+',
+    r'最寄り駅[：:\s]*[^\n]+',
+    r'徒歩[：:\s]*\d+分',
+    r'階[：:\s]*\d+階',
+    r'駐車場[：:\s]*[^\n]+',
+    r'設備[：:\s]*[^\n]+',
+    r'敷金[：:\s]*[^\n]+',
+    r'礼金[：:\s]*[^\n]+',
+    r'管理費[：:\s]*[^\n]+',
+    r'共益費[：:\s]*[^\n]+',
+    r'\d+万円',
+    r'\d+円',
+    r'\d+㎡',
+    r'\d+m²',
+    r'\d+K|\d+DK|\d+LDK',
+    r'築\d+年',
+]
+# 1パターンずつfindallすると全文走査がパターン数分発生するため、1つの選択肢に結合して1パスで抽出
+_PROPERTY_UNION_RE = re.compile('|'.join(f'(?:{p})' for p in _PROPERTY_PATTERNS), re.IGNORECASE)
+
 class ScrapingService:
     """Webスクレイピングサービス（テキスト圧縮機能付き）"""
     
     def __init__(self):
         self.headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+            # 圧縮転送を明示的に許可（転送バイト数の削減）。
+            # brの広告はurllib3がデコードできるようbrotli依存が前提（requirements.txt）
+            'Accept-Encoding': 'gzip, deflate, br',
         }
+
+        # コネクションプール付きSessionを使い回し、URLごとの
+        # TCP+TLSハンドシェイクを回避する。一時エラーは自動リトライ
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(
+            pool_connections=32,
+            pool_maxsize=32,
+            max_retries=Retry(
+                total=settings.MAX_RETRIES,
+                backoff_factor=0.3,
+                status_forcelist=[429, 500, 502, 503, 504],
+            ),
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
         self.text_compressor = TextCompressionService()
+
+        # URL単位のキャッシュ（TTL付き）。同一URLの再取得・再解析を丸ごとスキップする
+        self._scrape_cache = (
+            TTLCache(maxsize=512, ttl=settings.SCRAPE_CACHE_TTL)
+            if settings.ENABLE_SCRAPE_CACHE else None
+        )
+        # コンテンツハッシュ単位のキャッシュ。同一HTMLを配信する
+        # 別URL（ミラー等）間でも解析・圧縮の計算結果を共有できる
+        self._compress_cache = LRUCache(maxsize=512)
+        # 条件付きGET用の検証子とテキストの保存先。TTLキャッシュ失効後も
+        # ETag / Last-Modifiedを送れば、未変更ページは304でボディなしに済む
+        self._conditional_cache = LRUCache(maxsize=256)
+        # cachetoolsのキャッシュはスレッドセーフではないため、
+        # scrape_manyのスレッドプールからの並行アクセスをロックで直列化する
+        self._cache_lock = RLock()
     
     @staticmethod
     def is_url(text: str) -> bool:
         """テキストがURLかどうかを判定"""
-        try:
-            result = urlparse(text)
-            return all([result.scheme, result.netloc])
-        except Exception:
-            return False
+        return bool(_URL_RE.match(text))
     
     def scrape_website(self, url: str, enable_compression: bool = True, compression_ratio: float = 0.6) -> str:
         """
@@ -37,49 +163,89 @@ class ScrapingService:
         Returns:
             抽出・圧縮されたテキスト
         """
+        cache_key = (url, enable_compression, compression_ratio)
+        if self._scrape_cache is not None:
+            with self._cache_lock:
+                cached = self._scrape_cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"スクレイピングキャッシュヒット: {url}")
+                return cached
+
         try:
             logger.info(f"スクレイピング開始: {url}")
-            
-            response = requests.get(
-                url, 
-                headers=self.headers, 
-                timeout=settings.REQUEST_TIMEOUT
+
+            # 前回取得時の検証子があれば条件付きGETにする
+            with self._cache_lock:
+                conditional = self._conditional_cache.get(cache_key)
+            headers = {}
+            if conditional:
+                etag, last_modified, _ = conditional
+                if etag:
+                    headers['If-None-Match'] = etag
+                if last_modified:
+                    headers['If-Modified-Since'] = last_modified
+
+            response = self.session.get(
+                url, timeout=settings.REQUEST_TIMEOUT, headers=headers or None
             )
+
+            # 304 Not Modified: ボディなしで前回の結果を再利用
+            if response.status_code == 304 and conditional:
+                logger.info(f"304 Not Modified: {url}")
+                text = conditional[2]
+                if self._scrape_cache is not None:
+                    with self._cache_lock:
+                        self._scrape_cache[cache_key] = text
+                return text
+
             response.raise_for_status()
-            response.encoding = response.apparent_encoding
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # 不要なタグを削除
-            for tag in soup(['script', 'style', 'nav', 'header', 'footer', 'aside', 'iframe', 'noscript']):
-                tag.decompose()
-            
-            # より詳細な不要要素の除去
-            for class_name in ['advertisement', 'ads', 'banner', 'popup', 'modal', 'cookie', 'privacy']:
-                for element in soup.find_all(class_=lambda x: x and class_name in str(x).lower()):
-                    element.decompose()
-            
-            # テキストを抽出
-            text = soup.get_text()
-            
-            # 基本的なクリーニング
-            text = self._basic_clean_text(text)
-            
-            logger.info(f"生テキスト抽出完了: {len(text)}文字")
-            
-            # テキスト圧縮
-            if enable_compression:
-                target_length = int(settings.MAX_TEXT_LENGTH * compression_ratio)
-                text = self.text_compressor.compress_text(
-                    text, 
-                    max_length=target_length,
-                    compression_ratio=compression_ratio
-                )
+
+            # 同一HTMLに対する解析・圧縮結果はコンテンツハッシュで共有
+            content_key = (
+                hashlib.blake2b(response.content, digest_size=16).hexdigest(),
+                enable_compression,
+                compression_ratio,
+            )
+            with self._cache_lock:
+                text = self._compress_cache.get(content_key)
+            if text is not None:
+                logger.info(f"コンテンツキャッシュヒット: {url}")
             else:
-                # 圧縮無効の場合は最大文字数でカット
-                if len(text) > settings.MAX_TEXT_LENGTH:
-                    text = text[:settings.MAX_TEXT_LENGTH] + "..."
-            
+                # HTMLから本文テキストを抽出
+                text = self._parse_html(response.content, self._detect_encoding(response))
+
+                # 基本的なクリーニング
+                text = self._basic_clean_text(text)
+
+                logger.info(f"生テキスト抽出完了: {len(text)}文字")
+
+                # テキスト圧縮
+                if enable_compression:
+                    target_length = int(settings.MAX_TEXT_LENGTH * compression_ratio)
+                    text = self.text_compressor.compress_text(
+                        text,
+                        max_length=target_length,
+                        compression_ratio=compression_ratio
+                    )
+                else:
+                    # 圧縮無効の場合は最大文字数でカット
+                    if len(text) > settings.MAX_TEXT_LENGTH:
+                        text = text[:settings.MAX_TEXT_LENGTH] + "..."
+
+                with self._cache_lock:
+                    self._compress_cache[content_key] = text
+
+            if self._scrape_cache is not None:
+                with self._cache_lock:
+                    self._scrape_cache[cache_key] = text
+
+            # 次回の条件付きGETに備えて検証子を保存
+            etag = response.headers.get('ETag')
+            last_modified = response.headers.get('Last-Modified')
+            if etag or last_modified:
+                with self._cache_lock:
+                    self._conditional_cache[cache_key] = (etag, last_modified, text)
+
             logger.info(f"最終テキスト: {len(text)}文字")
             return text
             
@@ -90,91 +256,102 @@ class ScrapingService:
             logger.error(f"予期せぬエラー: {e}")
             raise Exception(f"処理中にエラーが発生しました: {str(e)}")
     
+    def scrape_many(self, urls: List[str], enable_compression: bool = True,
+                    compression_ratio: float = 0.6, max_workers: int = 8) -> List[Optional[str]]:
+        """複数URLを並行スクレイピング
+
+        ネットワーク待ちが支配的なため、プール済みSessionを共有する
+        スレッドプールでリクエストを重ね合わせる。結果は入力順を保持し、
+        失敗したURLはNoneを返す（1件の失敗が全体を止めない）。
+
+        Args:
+            urls: スクレイピング対象のURLリスト
+            enable_compression: テキスト圧縮を有効にするか
+            compression_ratio: 圧縮率（0.6 = 40%削減目標）
+            max_workers: 並行スレッド数の上限
+
+        Returns:
+            各URLに対応するテキストのリスト（失敗分はNone）
+        """
+        if not urls:
+            return []
+
+        def _scrape_one(url: str) -> Optional[str]:
+            try:
+                return self.scrape_website(
+                    url,
+                    enable_compression=enable_compression,
+                    compression_ratio=compression_ratio,
+                )
+            except Exception as e:
+                logger.warning(f"並行スクレイピング失敗: {url} - {e}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(urls))) as executor:
+            return list(executor.map(_scrape_one, urls))
+
+    @staticmethod
+    def _detect_encoding(response) -> str:
+        """レスポンスの文字エンコーディングを判定
+
+        Content-Typeヘッダーにcharset指定があればそれを、なければ本文から
+        推定する（charset未指定のShift_JIS/EUC-JPの物件ページ対策。
+        requestsはcharset未指定時ISO-8859-1を仮定するため信用しない）。
+        """
+        content_type = response.headers.get('Content-Type', '')
+        if 'charset=' in content_type.lower():
+            return response.encoding
+        return response.apparent_encoding or response.encoding or 'utf-8'
+
+    def _parse_html(self, content: bytes, encoding: Optional[str] = None) -> str:
+        """HTMLから不要要素を除去して本文テキストを抽出
+
+        selectolax（Lexbor）が利用可能ならそちらを使い、
+        なければBeautifulSoup + lxmlにフォールバックする。
+        """
+        if LexborHTMLParser is not None:
+            # Lexborはエンコーディング検出を行わずUTF-8を仮定するため、
+            # Shift_JIS/EUC-JPページの文字化けを防ぐには事前デコードが必要
+            tree = LexborHTMLParser(content.decode(encoding or 'utf-8', errors='replace'))
+            for node in tree.css(_NOISE_TAG_SELECTOR):
+                node.decompose()
+            for class_name in _NOISE_CLASSES:
+                for node in tree.css(f'[class*="{class_name}"]'):
+                    node.decompose()
+            body = tree.body
+            node = body if body is not None else tree.root
+            return node.text(separator=' ') if node is not None else ''
+
+        # フォールバック: lxml（C実装）はhtml.parserより5〜10倍高速。
+        # 生バイト列を渡してエンコーディング判定もlibxml2に任せる
+        soup = BeautifulSoup(content, 'lxml', parse_only=_BODY_STRAINER)
+
+        # 不要なタグを削除
+        for tag in soup(_NOISE_TAGS):
+            tag.decompose()
+
+        # より詳細な不要要素の除去
+        for class_name in _NOISE_CLASSES:
+            for element in soup.find_all(class_=lambda x: x and class_name in str(x).lower()):
+                element.decompose()
+
+        return soup.get_text()
+
     def _basic_clean_text(self, text: str) -> str:
         """基本的なテキストクリーニング"""
-        import re
-        
         # 連続する空白・改行を正規化
-        text = re.sub(r'\s+', ' ', text)
-        
-        # 不要な文字列を除去
-        unwanted_patterns = [
-            r'Cookie.*?設定',
-            r'プライバシーポリシー',
-            r'利用規約',
-            r'サイトマップ',
-            r'ページトップ',
-            r'メニュー',
-            r'ナビゲーション',
-            r'フッター',
-            r'ヘッダー',
-            r'広告',
-            r'PR',
-            r'スポンサー',
-            r'関連記事',
-            r'おすすめ',
-            r'人気記事',
-            r'ランキング',
-            r'タグ:',
-            r'カテゴリ:',
-            r'投稿日:',
-            r'更新日:',
-            r'作成者:',
-            r'シェア',
-            r'ツイート',
-            r'いいね',
-            r'コメント',
-            r'購読',
-            r'登録',
-            r'ログイン',
-            r'ログアウト',
-            r'マイページ',
-            r'お気に入り',
-            r'ブックマーク',
-        ]
-        
-        for pattern in unwanted_patterns:
-            text = re.sub(pattern, '', text, flags=re.IGNORECASE)
-        
+        text = _WS_RE.sub(' ', text)
+
+        # 不要な文字列を除去（結合済みパターンで1パス）
+        text = _UNWANTED_UNION_RE.sub('', text)
+
         return text.strip()
-    
+
     def extract_property_specific_info(self, text: str) -> str:
         """物件情報に特化した情報抽出"""
-        import re
-        
-        # 物件情報のキーワードパターン
-        property_patterns = [
-            r'物件名[：:\s]*[^\n]+',
-            r'住所[：:\s]*[^\n]+',
-            r'価格[：:\s]*[^\n]+',
-            r'賃料[：:\s]*[^\n]+',
-            r'家賃[：:\s]*[^\n]+',
-            r'面積[：:\s]*[^\n]+',
-            r'間取り[：:\s]*[^\n]+',
-            r'築年数[：:\s]*[^\n]+',
-            r'最寄り駅[：:\s]*[^\n]+',
-            r'徒歩[：:\s]*\d+分',
-            r'階[：:\s]*\d+階',
-            r'駐車場[：:\s]*[^\n]+',
-            r'設備[：:\s]*[^\n]+',
-            r'敷金[：:\s]*[^\n]+',
-            r'礼金[：:\s]*[^\n]+',
-            r'管理費[：:\s]*[^\n]+',
-            r'共益費[：:\s]*[^\n]+',
-            r'\d+万円',
-            r'\d+円',
-            r'\d+㎡',
-            r'\d+m²',
-            r'\d+K|\d+DK|\d+LDK',
-            r'築\d+年',
-        ]
-        
-        extracted_info = []
-        for pattern in property_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            extracted_info.extend(matches)
-        
-        # 重複除去と結合
-        unique_info = list(dict.fromkeys(extracted_info))  # 順序を保持して重複除去
-        
+        # 結合済みパターンで1パス抽出し、dictのキー順で重複除去
+        unique_info = dict.fromkeys(
+            m.group(0) for m in _PROPERTY_UNION_RE.finditer(text)
+        )
+
         return '\n'.join(unique_info) if unique_info else text
\ No newline at end of file
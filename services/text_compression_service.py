@@ -1,16 +1,45 @@
+import heapq
 import re
 from typing import Set, List
 from collections import Counter
+from operator import itemgetter
 import logging
 
 logger = logging.getLogger(__name__)
 
+# ホットパスで使う正規表現はモジュールロード時にコンパイルしておく
+_WS_RE = re.compile(r'\s+')
+_SENT_SPLIT_RE = re.compile(r'[.!?。！？]\s*')
+_SPECIAL_CHARS_RE = re.compile(r'[^\w\s\.\,\!\?\:\;\-\(\)\[\]\{\}\/\@\#\%\&\*\+\=\|\\\~\`\'\"]')
+_MULTI_DOT_RE = re.compile(r'[\.]{2,}')
+_MULTI_EXCL_RE = re.compile(r'[!]{2,}')
+_MULTI_QUES_RE = re.compile(r'[?]{2,}')
+_DIGIT_RE = re.compile(r'\d')
+# 単位の検出は単純な部分文字列の集合で足りる（正規表現エンジンを通すより安い）
+_UNIT_SUBSTRINGS = ('円', '㎡', 'm²', '分', 'km', '階', '年', '月')
+_WORD_RE = re.compile(r'\w+')
+
+# 物件情報に関連するキーワードと重み
+_IMPORTANT_KEYWORDS = {
+    '物件': 3, '住所': 3, '価格': 3, '賃料': 3, '家賃': 3, '面積': 3, '間取り': 3,
+    '最寄り': 2, '駅': 2, '徒歩': 2, '分': 2, '築': 2, '年': 2, '階': 2,
+    '設備': 2, 'バス': 1, 'トイレ': 1, 'キッチン': 1, 'エアコン': 1, '駐車場': 1,
+    '学校': 1, '病院': 1, 'コンビニ': 1, 'スーパー': 1, '公園': 1,
+    'ペット': 1, '敷金': 2, '礼金': 2, '管理費': 2, '共益費': 2
+}
+
+# 全キーワードを1つの選択肢に結合し、文章1回の走査で全ヒットを拾う
+# （長いキーワード優先でマッチさせるため長さ降順に並べる）
+_KEYWORD_RE = re.compile('|'.join(
+    re.escape(kw) for kw in sorted(_IMPORTANT_KEYWORDS, key=len, reverse=True)
+))
+
 class TextCompressionService:
     """テキスト圧縮サービス - 重複排除と最適化"""
     
     def __init__(self):
-        # 除外する一般的な単語（ストップワード）
-        self.stop_words = {
+        # 除外する一般的な単語（ストップワード）。不変なのでfrozensetで保持
+        self.stop_words = frozenset({
             'の', 'に', 'は', 'を', 'が', 'で', 'と', 'から', 'まで', 'より', 'へ',
             'という', 'ある', 'いる', 'する', 'なる', 'れる', 'られる', 'です', 'ます',
             'である', 'により', 'について', 'として', 'において', 'による', 'ため',
@@ -21,15 +50,16 @@ class TextCompressionService:
             'before', 'after', 'above', 'below', 'between', 'among', 'is', 'are',
             'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had', 'do', 'does',
             'did', 'will', 'would', 'could', 'should', 'may', 'might', 'must', 'can'
-        }
+        })
         
-        # 不要なパターン
+        # 不要なパターン（初期化時に1つの選択肢に結合してコンパイル）
         self.noise_patterns = [
             r'^\d+$',  # 数字のみ
             r'^[^\w\s]+$',  # 記号のみ
             r'^\s*$',  # 空白のみ
             r'^.{1,2}$',  # 1-2文字の短い単語
         ]
+        self._noise_re = re.compile('|'.join(f'(?:{p})' for p in self.noise_patterns))
     
     def compress_text(self, text: str, max_length: int = 30000, compression_ratio: float = 0.7) -> str:
         """
@@ -46,15 +76,20 @@ class TextCompressionService:
         try:
             logger.info(f"テキスト圧縮開始: {len(text)}文字")
             
-            # 1. 基本的なクリーニング
+            # 1. 基本的なクリーニング（全文1パスの正規表現のみ）
             cleaned_text = self._basic_cleaning(text)
-            
-            # 2. 重複文章の除去
-            deduplicated_text = self._remove_duplicate_sentences(cleaned_text)
-            
-            # 3. 重要な情報の抽出と再構成
-            compressed_text = self._extract_important_info(deduplicated_text)
-            
+
+            # 2. 文分割は1回だけ行い、重複除去とスコア計算を同一パスで実施
+            scored_sentences = self._process_sentences(cleaned_text)
+
+            # 3. スコア上位80%の文章を選択して再構成
+            #    全体ソート（O(N log N)）ではなくheapqの部分選択（O(N log K)）で取り出す
+            selected_count = max(1, int(len(scored_sentences) * 0.8))
+            top_sentences = heapq.nlargest(
+                selected_count, scored_sentences, key=itemgetter(1)
+            )
+            compressed_text = '. '.join(s for s, _ in top_sentences)
+
             # 4. 最終的な長さ調整
             if len(compressed_text) > max_length:
                 compressed_text = self._truncate_intelligently(compressed_text, max_length)
@@ -71,130 +106,118 @@ class TextCompressionService:
     def _basic_cleaning(self, text: str) -> str:
         """基本的なテキストクリーニング"""
         # 連続する空白・改行を正規化
-        text = re.sub(r'\s+', ' ', text)
-        
+        text = _WS_RE.sub(' ', text)
+
         # 特殊文字・記号の正規化
-        text = re.sub(r'[^\w\s\.\,\!\?\:\;\-\(\)\[\]\{\}\/\@\#\%\&\*\+\=\|\\\~\`\'\"]', ' ', text)
-        
+        text = _SPECIAL_CHARS_RE.sub(' ', text)
+
         # 連続する句読点を整理
-        text = re.sub(r'[\.]{2,}', '...', text)
-        text = re.sub(r'[!]{2,}', '!', text)
-        text = re.sub(r'[?]{2,}', '?', text)
-        
+        text = _MULTI_DOT_RE.sub('...', text)
+        text = _MULTI_EXCL_RE.sub('!', text)
+        text = _MULTI_QUES_RE.sub('?', text)
+
         return text.strip()
     
-    def _remove_duplicate_sentences(self, text: str) -> str:
-        """重複文章の除去"""
-        sentences = re.split(r'[.!?。！？]\s*', text)
-        unique_sentences = []
-        seen_sentences = set()
-        
+    @staticmethod
+    def _shingles(normalized: str) -> frozenset:
+        """正規化済み文章の4文字シングル集合（類似判定用）"""
+        if len(normalized) < 4:
+            return frozenset((normalized,))
+        return frozenset(normalized[i:i + 4] for i in range(len(normalized) - 3))
+
+    def _process_sentences(self, text: str) -> List[tuple]:
+        """文分割1回で重複除去とスコア計算をまとめて行う
+
+        従来は「重複除去」と「重要情報抽出」が別々に全文を分割・走査して
+        いたが、中間テキストの結合と再分割・再lower()を省くため1パスに融合。
+        類似判定は4文字シングル集合のJaccard係数（70%以上）で行い、
+        シングルを1つも共有しない文章ペアは転置インデックスにより比較
+        自体をスキップするため、全ペア総当たり（O(N^2)）にならない。
+
+        Returns:
+            採用された文章と重要度スコアのリスト（出現順）
+        """
+        sentences = _SENT_SPLIT_RE.split(text)
+        scored_sentences = []
+        seen_exact = set()
+        seen_shingles: List[frozenset] = []   # 採用済み文章のシングル集合
+        shingle_index = {}                    # シングル → 採用済み文章インデックスのリスト
+
         for sentence in sentences:
             sentence = sentence.strip()
             if not sentence:
                 continue
-                
+
             # 文章の正規化（小文字化、空白除去）
-            normalized = re.sub(r'\s+', '', sentence.lower())
-            
+            normalized = _WS_RE.sub('', sentence.lower())
+
             # 短すぎる文章や数字のみの文章をスキップ
             if len(normalized) < 10 or normalized.isdigit():
                 continue
-            
-            # 類似文章の検出（70%以上一致）
+
+            # 完全一致は即スキップ
+            if normalized in seen_exact:
+                continue
+
+            # 類似文章の検出（Jaccard係数 70%以上）
+            shingles = self._shingles(normalized)
+            candidate_ids = set()
+            for shingle in shingles:
+                candidate_ids.update(shingle_index.get(shingle, ()))
+
             is_duplicate = False
-            for seen in seen_sentences:
-                if self._calculate_similarity(normalized, seen) > 0.7:
+            for idx in candidate_ids:
+                other = seen_shingles[idx]
+                intersection = len(shingles & other)
+                if intersection and intersection / len(shingles | other) > 0.7:
                     is_duplicate = True
                     break
-            
-            if not is_duplicate:
-                unique_sentences.append(sentence)
-                seen_sentences.add(normalized)
-        
-        return '. '.join(unique_sentences)
-    
-    def _extract_important_info(self, text: str) -> str:
-        """重要な情報の抽出"""
-        # 物件情報に関連するキーワード
-        important_keywords = {
-            '物件': 3, '住所': 3, '価格': 3, '賃料': 3, '家賃': 3, '面積': 3, '間取り': 3,
-            '最寄り': 2, '駅': 2, '徒歩': 2, '分': 2, '築': 2, '年': 2, '階': 2,
-            '設備': 2, 'バス': 1, 'トイレ': 1, 'キッチン': 1, 'エアコン': 1, '駐車場': 1,
-            '学校': 1, '病院': 1, 'コンビニ': 1, 'スーパー': 1, '公園': 1,
-            'ペット': 1, '敷金': 2, '礼金': 2, '管理費': 2, '共益費': 2
-        }
-        
-        sentences = re.split(r'[.!?。！？]\s*', text)
-        scored_sentences = []
-        
-        for sentence in sentences:
-            sentence = sentence.strip()
-            if len(sentence) < 5:
+            if is_duplicate:
                 continue
-                
-            # 文章のスコア計算
-            score = 0
-            for keyword, weight in important_keywords.items():
-                count = sentence.lower().count(keyword.lower())
-                score += count * weight
-            
+
+            idx = len(seen_shingles)
+            seen_shingles.append(shingles)
+            for shingle in shingles:
+                shingle_index.setdefault(shingle, []).append(idx)
+            seen_exact.add(normalized)
+
+            # 文章のスコア計算（結合済みキーワードパターンで1パス）
+            score = sum(_IMPORTANT_KEYWORDS[kw] for kw in _KEYWORD_RE.findall(sentence))
+
             # 数字が含まれている文章は重要度アップ
-            if re.search(r'\d+', sentence):
+            if _DIGIT_RE.search(sentence):
                 score += 1
-                
+
             # 単位が含まれている文章は重要度アップ
-            if re.search(r'(万円|円|㎡|m²|分|km|階|年|月)', sentence):
+            if any(unit in sentence for unit in _UNIT_SUBSTRINGS):
                 score += 2
-            
+
             scored_sentences.append((sentence, score))
-        
-        # スコア順にソートして上位を選択
-        scored_sentences.sort(key=lambda x: x[1], reverse=True)
-        
-        # 上位80%の文章を選択
-        selected_count = max(1, int(len(scored_sentences) * 0.8))
-        important_sentences = [sentence for sentence, _ in scored_sentences[:selected_count]]
-        
-        return '. '.join(important_sentences)
-    
+
+        return scored_sentences
+
+
     def _truncate_intelligently(self, text: str, max_length: int) -> str:
         """インテリジェントな切り詰め"""
         if len(text) <= max_length:
             return text
         
-        # 文章単位で切り詰め
-        sentences = re.split(r'[.!?。！？]\s*', text)
-        result = ""
-        
+        # 文章単位で切り詰め（文字列連結の二次コストを避けてリスト+joinで組み立て）
+        sentences = _SENT_SPLIT_RE.split(text)
+        parts = []
+        current_length = 0
+        limit = max_length - 3  # "..."の分を考慮
+
         for sentence in sentences:
-            if len(result + sentence + '. ') <= max_length - 3:  # "..."の分を考慮
-                result += sentence + '. '
-            else:
+            added = len(sentence) + 2  # '. 'の分
+            if current_length + added > limit:
                 break
-        
-        return result.rstrip() + "..."
-    
-    def _calculate_similarity(self, text1: str, text2: str) -> float:
-        """2つのテキストの類似度を計算"""
-        if not text1 or not text2:
-            return 0.0
-        
-        # 文字レベルでの類似度計算（簡易版）
-        longer = text1 if len(text1) > len(text2) else text2
-        shorter = text2 if len(text1) > len(text2) else text1
-        
-        if len(longer) == 0:
-            return 1.0
-        
-        # 共通文字数をカウント
-        common_chars = 0
-        for char in shorter:
-            if char in longer:
-                common_chars += 1
-                longer = longer.replace(char, '', 1)
-        
-        return common_chars / len(shorter)
+            parts.append(sentence)
+            current_length += added
+
+        if not parts:
+            return "..."
+        return '. '.join(parts) + '....'
     
     def remove_duplicate_words(self, text: str, preserve_order: bool = True) -> str:
         """
@@ -208,29 +231,35 @@ class TextCompressionService:
             重複を除去したテキスト
         """
         # 単語に分割（日本語対応）
-        words = re.findall(r'\w+', text)
-        
+        words = _WORD_RE.findall(text)
+
+        # ホットループ内の属性参照を避けるためローカル名に束縛
+        stop_words = self.stop_words
+        is_noise = self._is_noise_word
+
         if preserve_order:
-            # 語順を保持して重複除去
+            # 語順を保持して重複除去（lower()は単語ごとに1回だけ）
             seen = set()
             unique_words = []
             for word in words:
                 word_lower = word.lower()
-                if word_lower not in seen and word_lower not in self.stop_words:
-                    if not self._is_noise_word(word):
-                        unique_words.append(word)
-                        seen.add(word_lower)
+                if word_lower in seen or word_lower in stop_words or is_noise(word):
+                    continue
+                seen.add(word_lower)
+                unique_words.append(word)
         else:
             # 頻度順に並び替え
-            word_freq = Counter(word.lower() for word in words 
-                              if word.lower() not in self.stop_words and not self._is_noise_word(word))
+            word_freq = Counter(
+                word_lower for word in words
+                if (word_lower := word.lower()) not in stop_words and not is_noise(word)
+            )
             unique_words = [word for word, _ in word_freq.most_common()]
-        
+
         return ' '.join(unique_words)
     
     def _is_noise_word(self, word: str) -> bool:
         """ノイズ単語の判定"""
-        for pattern in self.noise_patterns:
-            if re.match(pattern, word):
-                return True
-        return False
\ No newline at end of file
+        # 安価な判定（長さ・数字のみ）を先に行い、正規表現は記号のみ等の残りに限定
+        if len(word) <= 2 or word.isdigit():
+            return True
+        return self._noise_re.match(word) is not None
\ No newline at end of file